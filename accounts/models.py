@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
 
 
 class CustomUserManager(BaseUserManager):
@@ -519,6 +520,14 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
             'HR_ADMIN'
         ]
     
+    @cached_property
+    def is_hr_admin(self):
+        """
+        True if user has HR Admin approval authority
+        Cached per instance: checked once per row in HR approval listings
+        """
+        return self.approval_level == 'HR_ADMIN'
+    
     def get_subordinates(self):
         """
         Get all employees reporting to this user
@@ -1,6 +1,98 @@
 from django.contrib import admin
-from django.utils.html import format_html
-from .models import Holiday, AttendanceSettings, Attendance, AttendanceApprovalRequest
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import CharField, F, Func, QuerySet, Value
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from types import MappingProxyType
+from .models import Holiday, AttendanceSettings, Attendance, AttendanceApprovalRequest, ACTIVE_HOLIDAYS_CACHE_KEY
+
+
+# Colours are trusted constants; only the labels/names need escaping, so these
+# are filled with %-interpolation instead of re-parsing via format_html per row
+_STATUS_TEMPLATE = '<span style="color: %s; font-weight: bold;">%s</span>'
+_REVIEW_TEMPLATE = '%s<br><small style="color: gray;">%s</small>'
+
+_ATTENDANCE_COLORS = MappingProxyType({
+    'PRESENT': '#28a745',
+    'ABSENT': '#dc3545',
+    'ON_LEAVE': '#007bff',
+    'WEEKEND': '#6c757d',
+    'HOLIDAY': '#6f42c1',
+    'SUSPENDED': '#fd7e14',
+})
+
+_APPROVAL_COLORS = MappingProxyType({
+    'PENDING': '#fd7e14',
+    'SUPERVISOR_APPROVED': '#007bff',
+    'HR_APPROVED': '#28a745',
+    'REJECTED': '#dc3545',
+})
+
+
+def _review_info(reviewer, reviewed_at):
+    return mark_safe(_REVIEW_TEMPLATE % (escape(reviewer.get_short_name()), reviewed_at or '-'))
+
+
+def _to_char(field):
+    # PostgreSQL to_char(); same output as strftime('%Y-%m-%d %H:%M') on the UTC session
+    return Func(F(field), Value('YYYY-MM-DD HH24:MI'), function='to_char', output_field=CharField())
+
+
+def _is_changelist(request):
+    match = getattr(request, 'resolver_match', None)
+    return bool(match and match.url_name and match.url_name.endswith('_changelist'))
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads the planner's row estimate instead of running
+    SELECT COUNT(*) when the changelist is unfiltered.
+    Filtered/searched querysets and small tables still get an exact count.
+    """
+    ESTIMATE_THRESHOLD = 10000
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = self._estimated_count(queryset)
+            if estimate is not None and estimate > self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+    
+    def _estimated_count(self, queryset):
+        table = queryset.model._meta.db_table
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+                row = cursor.fetchone()
+                # reltuples is -1 until the table has been analyzed
+                return row[0] if row and row[0] >= 0 else None
+            if connection.vendor == 'mysql':
+                cursor.execute('SHOW TABLE STATUS LIKE %s', [table])
+                row = cursor.fetchone()
+                return row[4] if row else None
+        return None
+
+
+class PendingRequestFilter(admin.SimpleListFilter):
+    # Filters on the with_pending_flag() annotation added in AttendanceAdmin.get_queryset
+    title = 'Has Pending Approval Request'
+    parameter_name = 'has_pending_approval_request'
+    
+    def lookups(self, request, model_admin):
+        return [('1', 'Yes'), ('0', 'No')]
+    
+    def queryset(self, request, queryset):
+        if self.value() in ('0', '1'):
+            return queryset.filter(has_pending_approval_request=self.value() == '1')
+        return queryset
 
 
 @admin.register(Holiday)
@@ -24,11 +116,13 @@ class HolidayAdmin(admin.ModelAdmin):
     
     def activate_holidays(self, request, queryset):
         updated = queryset.update(is_active=True)
+        cache.delete(ACTIVE_HOLIDAYS_CACHE_KEY)
         self.message_user(request, f'{updated} holiday(s) activated.')
     activate_holidays.short_description = "Activate selected holidays"
     
     def deactivate_holidays(self, request, queryset):
         updated = queryset.update(is_active=False)
+        cache.delete(ACTIVE_HOLIDAYS_CACHE_KEY)
         self.message_user(request, f'{updated} holiday(s) deactivated.')
     deactivate_holidays.short_description = "Deactivate selected holidays"
 
@@ -59,11 +153,16 @@ class AttendanceSettingsAdmin(admin.ModelAdmin):
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
-    list_display = ['employee', 'date', 'clock_in_time', 'clock_out_time', 'hours_worked', 'colored_status', 'has_pending_approval_request']
-    list_filter = ['employeeDayStatus', 'date', 'employee__department', 'employee__unit', 'has_pending_approval_request']
+    list_display = ['employee', 'date', 'clock_in_time', 'clock_out_time', 'hours_worked', 'colored_status', 'pending_request']
+    list_filter = ['employeeDayStatus', 'date', 'employee__department', 'employee__unit', PendingRequestFilter]
     search_fields = ['employee__first_name', 'employee__last_name', 'employee__email', 'employee__employee_id']
-    ordering = ['-date', 'employee']
-    readonly_fields = ['created_at', 'updated_at', 'hours_worked']
+    # employee_id, not employee: ordering by the FK would sort by CustomUser.Meta.ordering
+    # through a join, which attendance_date_employee_idx can't serve
+    ordering = ['-date', 'employee_id']
+    readonly_fields = ['created_at', 'updated_at', 'hours_worked', 'pending_request', 'is_weekend', 'is_holiday']
+    raw_id_fields = ['employee']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Employee & Date', {
@@ -73,7 +172,7 @@ class AttendanceAdmin(admin.ModelAdmin):
             'fields': ('clock_in_time', 'clock_out_time')
         }),
         ('Status & Hours', {
-            'fields': ('employeeDayStatus', 'hours_worked', 'has_pending_approval_request')
+            'fields': ('employeeDayStatus', 'status_overridden', 'hours_worked', 'pending_request', 'is_weekend', 'is_holiday')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -82,45 +181,64 @@ class AttendanceAdmin(admin.ModelAdmin):
     )
     
     def colored_status(self, obj):
-        colors = {
-            'PRESENT': '#28a745',
-            'ABSENT': '#dc3545',
-            'ON_LEAVE': '#007bff',
-            'WEEKEND': '#6c757d',
-            'HOLIDAY': '#6f42c1',
-            'SUSPENDED': '#fd7e14'
-        }
-        color = colors.get(obj.employeeDayStatus, '#000000')
-        return format_html('<span style="color: {}; font-weight: bold;">{}</span>', color, obj.get_employeeDayStatus_display())
+        color = _ATTENDANCE_COLORS.get(obj.employeeDayStatus, '#000000')
+        return mark_safe(_STATUS_TEMPLATE % (color, escape(obj.get_employeeDayStatus_display())))
     colored_status.short_description = 'Status'
     
+    def pending_request(self, obj):
+        return obj.has_pending_request()
+    pending_request.short_description = 'Has Pending Approval Request'
+    pending_request.boolean = True
+    pending_request.admin_order_field = 'has_pending_approval_request'
+    
     def get_queryset(self, request):
-        queryset = super().get_queryset(request)
+        queryset = super().get_queryset(request).with_pending_flag()
         queryset = queryset.select_related('employee', 'employee__department', 'employee__unit')
         return queryset
     
-    actions = ['mark_as_present']
+    actions = ['mark_as_present', 'recalculate_status']
     
     def mark_as_present(self, request, queryset):
-        if not request.user.is_superuser and request.user.approval_level != 'HR_ADMIN':
+        if not request.user.is_superuser and not request.user.is_hr_admin:
             self.message_user(request, 'Only HR Admin can bulk mark as present.', level='error')
             return
-        updated = queryset.update(employeeDayStatus='PRESENT')
+        # status_overridden keeps save() and recalculate_status from recomputing this back to ABSENT
+        updated = queryset.update(employeeDayStatus='PRESENT', status_overridden=True, updated_at=timezone.now())
         self.message_user(request, f'{updated} record(s) marked as PRESENT.')
     mark_as_present.short_description = "Mark selected as PRESENT (HR only)"
+    
+    def recalculate_status(self, request, queryset):
+        if not request.user.is_superuser and not request.user.is_hr_admin:
+            self.message_user(request, 'Only HR Admin can recalculate attendance.', level='error')
+            return
+        records = list(queryset.select_related('employee'))
+        try:
+            # Leaves the status of status_overridden records alone
+            Attendance.validate_many(records)
+        except ValidationError as e:
+            self.message_user(request, f'Nothing recalculated: {"; ".join(e.messages)}', level='error')
+            return
+        # bulk_update() doesn't apply auto_now
+        now = timezone.now()
+        for record in records:
+            record.updated_at = now
+        Attendance.objects.bulk_update(records, ['employeeDayStatus', 'is_weekend', 'is_holiday', 'updated_at'], batch_size=500)
+        kept = sum(record.status_overridden for record in records)
+        self.message_user(request, f'{len(records)} record(s) recalculated, {kept} HR-set status(es) left unchanged.')
+    recalculate_status.short_description = "Recalculate status (HR only)"
 
 
 @admin.register(AttendanceApprovalRequest)
 class AttendanceApprovalRequestAdmin(admin.ModelAdmin):
     list_display = ['employee', 'attendance_date', 'colored_status', 'supervisor_info', 'hr_info', 'created_at']
-    list_filter = ['status', 'attendance__date', 'created_at']
+    list_filter = ['status', 'attendance_date', 'created_at']
     search_fields = ['employee__first_name', 'employee__last_name', 'employee__email', 'reason']
     ordering = ['-created_at']
-    readonly_fields = ['employee', 'attendance', 'reason', 'supporting_documents', 'supervisor_reviewed_by', 'supervisor_review_notes', 'supervisor_reviewed_at', 'hr_reviewed_by', 'hr_review_notes', 'hr_reviewed_at', 'created_at', 'updated_at']
+    readonly_fields = ['employee', 'unit', 'assigned_supervisor', 'attendance', 'attendance_date', 'reason', 'supporting_documents', 'supervisor_reviewed_by', 'supervisor_review_notes', 'supervisor_reviewed_at', 'hr_reviewed_by', 'hr_review_notes', 'hr_reviewed_at', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Request Details', {
-            'fields': ('employee', 'attendance', 'reason', 'supporting_documents', 'status')
+            'fields': ('employee', 'unit', 'assigned_supervisor', 'attendance', 'attendance_date', 'reason', 'supporting_documents', 'status')
         }),
         ('Supervisor Review', {
             'fields': ('supervisor_reviewed_by', 'supervisor_review_notes', 'supervisor_reviewed_at')
@@ -134,52 +252,76 @@ class AttendanceApprovalRequestAdmin(admin.ModelAdmin):
         }),
     )
     
-    def attendance_date(self, obj):
-        return obj.attendance.date
-    attendance_date.short_description = 'Attendance Date'
-    attendance_date.admin_order_field = 'attendance__date'
+    # employee is rendered via CustomUser.__str__ (full name + email), reviewers via get_short_name()
+    changelist_fields = (
+        'id', 'status', 'created_at', 'assigned_supervisor',
+        'employee', 'employee__first_name', 'employee__middle_name', 'employee__last_name', 'employee__email',
+        'attendance_date', 'attendance',
+        'supervisor_reviewed_by', 'supervisor_reviewed_by__first_name',
+        'hr_reviewed_by', 'hr_reviewed_by__first_name',
+    )
     
     def colored_status(self, obj):
-        colors = {
-            'PENDING': '#fd7e14',
-            'SUPERVISOR_APPROVED': '#007bff',
-            'HR_APPROVED': '#28a745',
-            'REJECTED': '#dc3545'
-        }
-        color = colors.get(obj.status, '#000000')
-        return format_html('<span style="color: {}; font-weight: bold;">{}</span>', color, obj.get_status_display())
+        color = _APPROVAL_COLORS.get(obj.status, '#000000')
+        return mark_safe(_STATUS_TEMPLATE % (color, escape(obj.get_status_display())))
     colored_status.short_description = 'Status'
     
     def supervisor_info(self, obj):
         if obj.supervisor_reviewed_by:
-            return format_html('{}<br><small style="color: gray;">{}</small>', obj.supervisor_reviewed_by.get_short_name(), obj.supervisor_reviewed_at.strftime('%Y-%m-%d %H:%M') if obj.supervisor_reviewed_at else '-')
+            return _review_info(obj.supervisor_reviewed_by, obj.sup_at_str)
         return '-'
     supervisor_info.short_description = 'Supervisor Review'
     
     def hr_info(self, obj):
         if obj.hr_reviewed_by:
-            return format_html('{}<br><small style="color: gray;">{}</small>', obj.hr_reviewed_by.get_short_name(), obj.hr_reviewed_at.strftime('%Y-%m-%d %H:%M') if obj.hr_reviewed_at else '-')
+            return _review_info(obj.hr_reviewed_by, obj.hr_at_str)
         return '-'
     hr_info.short_description = 'HR Review'
     
+    actions = ['supervisor_approve_selected', 'hr_approve_selected']
+    
+    def supervisor_approve_selected(self, request, queryset):
+        if not request.user.is_superuser and request.user.approval_level != 'SUPERVISOR':
+            self.message_user(request, 'Only supervisors can approve requests at this stage.', level='error')
+            return
+        updated = AttendanceApprovalRequest.bulk_supervisor_approve(queryset, request.user)
+        self.message_user(request, f'{updated} request(s) approved and sent to HR.')
+    supervisor_approve_selected.short_description = "Approve selected pending requests (Supervisor)"
+    
+    def hr_approve_selected(self, request, queryset):
+        if not request.user.is_superuser and not request.user.is_hr_admin:
+            self.message_user(request, 'Only HR Admin can give final approval.', level='error')
+            return
+        updated = AttendanceApprovalRequest.bulk_hr_approve(queryset, request.user)
+        self.message_user(request, f'{updated} request(s) approved and marked PRESENT.')
+    hr_approve_selected.short_description = "Approve selected supervisor-approved requests (HR only)"
+    
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
-        queryset = queryset.select_related('employee', 'attendance', 'supervisor_reviewed_by', 'hr_reviewed_by')
-        if request.user.is_superuser or request.user.approval_level == 'HR_ADMIN':
+        if _is_changelist(request):
+            # The list renders no supervisor or attendance row: join only the names it shows
+            # and fetch only the columns list_display needs; the detail view gets queue()
+            queryset = queryset.select_related(
+                'employee', 'supervisor_reviewed_by', 'hr_reviewed_by'
+            ).only(*self.changelist_fields).annotate(
+                sup_at_str=_to_char('supervisor_reviewed_at'),
+                hr_at_str=_to_char('hr_reviewed_at'),
+            )
+        else:
+            queryset = queryset.queue()
+        if request.user.is_superuser or request.user.is_hr_admin:
             return queryset
         if request.user.approval_level == 'SUPERVISOR':
-            if hasattr(request.user, 'unit_supervised'):
-                return queryset.filter(employee__unit=request.user.unit_supervised, status='PENDING')
+            return queryset.filter(assigned_supervisor=request.user, status='PENDING')
         return queryset.filter(employee=request.user)
     
     def has_change_permission(self, request, obj=None):
         if request.user.is_superuser:
             return True
-        if request.user.approval_level == 'HR_ADMIN':
+        if request.user.is_hr_admin:
             return True
         if request.user.approval_level == 'SUPERVISOR' and obj:
-            if hasattr(request.user, 'unit_supervised'):
-                return obj.employee.unit == request.user.unit_supervised and obj.status == 'PENDING'
+            return obj.assigned_supervisor_id == request.user.pk and obj.status == 'PENDING'
         return False
 
 
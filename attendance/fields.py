@@ -0,0 +1,41 @@
+from django.db import models
+from django.utils.functional import cached_property
+
+
+class SmallIntChoiceField(models.PositiveSmallIntegerField):
+    """
+    Stores a fixed set of string codes in a 2-byte integer column.
+    Python code, forms and ORM lookups keep using the string codes from `choices`;
+    only the column (and its indexes) are numeric. The stored value is the code's
+    1-based position in `choices`, so new codes must only ever be appended.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        codes = [code for code, _ in self.flatchoices]
+        self._code_to_int = {code: number for number, code in enumerate(codes, start=1)}
+        self._int_to_code = {number: code for code, number in self._code_to_int.items()}
+    
+    @cached_property
+    def validators(self):
+        # Values are string codes in Python; the integer range validators don't apply
+        return [*self.default_validators, *self._validators]
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self._int_to_code[value]
+    
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self._int_to_code.get(value, value)
+    
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return self._code_to_int[value]
+        except KeyError:
+            raise ValueError(f"Field '{self.name}' expected one of {list(self._code_to_int)} but got {value!r}.")
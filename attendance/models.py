@@ -1,10 +1,41 @@
-from django.db import models
+from django.conf import settings as django_settings
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models, transaction
+from django.db.models import Exists, ExpressionWrapper, F, OuterRef, Q
+from django.db.models.functions import Cast, Extract, Now
 from django.utils import timezone
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from accounts.models import CustomUser
+from accounts.models import CustomUser, Unit
+from .fields import SmallIntChoiceField
+from functools import cached_property
+from itertools import product
+from types import MappingProxyType
 import datetime
 
 
+ACTIVE_HOLIDAYS_CACHE_KEY = 'holiday_dates'
+ACTIVE_SETTINGS_CACHE_KEY = 'attendance_active_settings'
+
+
+# Approval request states still awaiting a decision
+LIVE_REQUEST_STATUSES = ('PENDING', 'SUPERVISOR_APPROVED')
+
+
+def pending_queue_cache_key(supervisor_id):
+    return f'pending_for_sup:{supervisor_id}'
+
+
+_CLOCK_ORDER_ERROR = 'Clock-out time must be after clock-in time'
+
+
+def _as_date(value):
+    # Attendance.date defaults to timezone.now, so an unsaved record can still hold a datetime
+    if isinstance(value, datetime.datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
 class Holiday(models.Model):
     name = models.CharField(max_length=200, verbose_name='Holiday Name')
     date = models.DateField(unique=True, verbose_name='Date')
@@ -19,6 +50,66 @@ class Holiday(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.date}"
+    
+    @classmethod
+    def is_holiday(cls, date):
+        date = _as_date(date)
+        if getattr(django_settings, 'HOLIDAY_CACHE_ENABLED', True):
+            return date in cls.active_dates()
+        # date is unique, so this is a single index probe
+        return cls.objects.filter(date=date, is_active=True).exists()
+    
+    @classmethod
+    def active_dates(cls):
+        # Invalidated by the Holiday post_save/post_delete handlers in signals.py
+        return cache.get_or_set(
+            ACTIVE_HOLIDAYS_CACHE_KEY,
+            lambda: frozenset(cls.objects.filter(is_active=True).values_list('date', flat=True)),
+            timeout=3600,
+        )
+
+
+def _classify_day(employee_status, is_weekend, is_holiday, clocked_in_on_time):
+    if employee_status in ('SUSPENDED', 'ON_LEAVE'):
+        return employee_status
+    if is_weekend:
+        return 'WEEKEND'
+    if is_holiday:
+        return 'HOLIDAY'
+    return 'PRESENT' if clocked_in_on_time else 'ABSENT'
+
+
+# Every (employee_status, is_weekend, is_holiday, clocked_in_on_time) combination,
+# resolved once at import so Attendance status computation is a single dict lookup
+_STATUS_TABLE = MappingProxyType({
+    key: _classify_day(*key)
+    for key in product(
+        [code for code, _ in CustomUser.EMPLOYEE_STATUS_CHOICES],
+        (False, True),
+        (False, True),
+        (False, True),
+    )
+})
+
+
+def _make_day_classifier(work_start, is_weekend, is_holiday):
+    """
+    Status function for a single date: the date-level inputs are fixed, so the
+    table is narrowed up front and each call only keys on the employee.
+    """
+    table = {
+        (employee_status, on_time): _STATUS_TABLE[(employee_status, is_weekend, is_holiday, on_time)]
+        for employee_status, _ in CustomUser.EMPLOYEE_STATUS_CHOICES
+        for on_time in (False, True)
+    }
+    
+    def classify(employee_status, clock_in_time):
+        return table[(employee_status, clock_in_time is not None and clock_in_time <= work_start)]
+    return classify
+
+
+def _work_start(settings):
+    return settings.work_start_time if settings else datetime.time(9, 0)
 
 
 class AttendanceSettings(models.Model):
@@ -35,16 +126,39 @@ class AttendanceSettings(models.Model):
     class Meta:
         verbose_name = 'Attendance Settings'
         verbose_name_plural = 'Attendance Settings'
+        constraints = [
+            # At most one active row; the partial unique index also serves get_active_settings()
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=Q(is_active=True),
+                name='one_active_settings',
+                violation_error_message='Only one attendance settings record can be active',
+            ),
+        ]
     
     def __str__(self):
         return f"Attendance Settings (Active: {self.is_active})"
     
     @classmethod
     def get_active_settings(cls):
-        return cls.objects.filter(is_active=True).first()
+        # Invalidated by the AttendanceSettings post_save/post_delete handlers in signals.py
+        return cache.get_or_set(
+            ACTIVE_SETTINGS_CACHE_KEY,
+            lambda: cls.objects.filter(is_active=True).first(),
+            timeout=3600,
+        )
+
+
+class AttendanceQuerySet(models.QuerySet):
+    def with_pending_flag(self):
+        """Annotate has_pending_approval_request from the live approval requests (one index probe per row)"""
+        return self.annotate(has_pending_approval_request=Exists(
+            AttendanceApprovalRequest.objects.filter(attendance=OuterRef('pk'), status__in=LIVE_REQUEST_STATUSES)
+        ))
 
 
 class Attendance(models.Model):
+    # Stored by position (see SmallIntChoiceField): append new statuses, never reorder
     STATUS_CHOICES = [
         ('PRESENT', 'Present'),
         ('ABSENT', 'Absent'),
@@ -58,12 +172,29 @@ class Attendance(models.Model):
     date = models.DateField(default=timezone.now, verbose_name='Date')
     clock_in_time = models.TimeField(null=True, blank=True, verbose_name='Clock In Time')
     clock_out_time = models.TimeField(null=True, blank=True, verbose_name='Clock Out Time')
-    employeeDayStatus = models.CharField(max_length=20, choices=STATUS_CHOICES, verbose_name='Day Status', db_index=True)
-    hours_worked = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name='Hours Worked')
-    has_pending_approval_request = models.BooleanField(default=False, verbose_name='Has Pending Approval Request')
+    employeeDayStatus = SmallIntChoiceField(choices=STATUS_CHOICES, verbose_name='Day Status', db_index=True)
+    # Computed by the database from the clock times; NULL until both are set
+    hours_worked = models.GeneratedField(
+        expression=Cast(
+            Extract(ExpressionWrapper(F('clock_out_time') - F('clock_in_time'), output_field=models.DurationField()), 'epoch'),
+            models.DecimalField(max_digits=12, decimal_places=2),
+        ) / 3600,
+        output_field=models.DecimalField(max_digits=4, decimal_places=2),
+        db_persist=True,
+        null=True,
+        verbose_name='Hours Worked',
+    )
+    # Resolved alongside employeeDayStatus so reports never re-derive the calendar
+    is_weekend = models.BooleanField(default=False, verbose_name='Weekend')
+    is_holiday = models.BooleanField(default=False, verbose_name='Public Holiday')
+    # Set when HR fixes the status by hand (mark_as_present, an HR-approved request);
+    # the computed status is then left alone until HR clears it
+    status_overridden = models.BooleanField(default=False, verbose_name='Status Set by HR')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
+    objects = AttendanceQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Attendance Record'
         verbose_name_plural = 'Attendance Records'
@@ -71,67 +202,145 @@ class Attendance(models.Model):
         unique_together = ['employee', 'date']
         indexes = [
             models.Index(fields=['employee', 'date']),
-            models.Index(fields=['date']),
+            # Rows are written day by day, so date correlates with physical order;
+            # BRIN serves the range scans of reports at a fraction of a B-tree's size
+            BrinIndex(fields=['date'], pages_per_range=32, name='attendance_date_brin'),
+            # BRIN can't return rows in order: this serves the admin changelist's ORDER BY
+            models.Index(fields=['-date', 'employee'], name='attendance_date_employee_idx'),
             models.Index(fields=['employeeDayStatus']),
         ]
+        constraints = [
+            # Single source for this rule: forms report it through validate_constraints(),
+            # and the database enforces it for direct ORM and bulk writes
+            models.CheckConstraint(
+                condition=Q(clock_in_time__isnull=True) | Q(clock_out_time__isnull=True) | Q(clock_out_time__gt=F('clock_in_time')),
+                name='clock_out_after_in',
+                violation_error_message=_CLOCK_ORDER_ERROR,
+            ),
+        ]
     
     def __str__(self):
         return f"{self.employee.get_full_name()} - {self.date} - {self.employeeDayStatus}"
     
-    def clean(self):
-        if self.clock_in_time and self.clock_out_time:
-            if self.clock_out_time <= self.clock_in_time:
-                raise ValidationError("Clock-out time must be after clock-in time")
-    
     def save(self, *args, **kwargs):
-        settings = AttendanceSettings.get_active_settings()
-        if not settings:
-            work_start = datetime.time(9, 0)
-            clock_out_deadline = datetime.time(18, 1)
-        else:
-            work_start = settings.work_start_time
-            clock_out_deadline = settings.clock_out_deadline
-        
-        if self.employee.employee_status == 'SUSPENDED':
-            self.employeeDayStatus = 'SUSPENDED'
-        elif self.employee.employee_status == 'ON_LEAVE':
-            self.employeeDayStatus = 'ON_LEAVE'
-        elif self.date.weekday() in [5, 6]:
-            self.employeeDayStatus = 'WEEKEND'
-        elif Holiday.objects.filter(date=self.date, is_active=True).exists():
-            self.employeeDayStatus = 'HOLIDAY'
-        else:
-            if self.clock_in_time:
-                if self.clock_in_time <= work_start:
-                    if self.clock_out_time:
-                        self.employeeDayStatus = 'PRESENT'
-                    else:
-                        self.employeeDayStatus = 'PRESENT'
-                else:
-                    self.employeeDayStatus = 'ABSENT'
-            else:
-                self.employeeDayStatus = 'ABSENT'
-        
-        if self.clock_in_time and self.clock_out_time:
-            clock_in_datetime = datetime.datetime.combine(self.date, self.clock_in_time)
-            clock_out_datetime = datetime.datetime.combine(self.date, self.clock_out_time)
-            time_diff = clock_out_datetime - clock_in_datetime
-            self.hours_worked = round(time_diff.total_seconds() / 3600, 2)
-        
+        self.refresh_computed_fields(AttendanceSettings.get_active_settings())
         super().save(*args, **kwargs)
+        # save() doesn't refresh generated fields on UPDATE; drop the stale value so the
+        # next access loads what the database computed
+        self.__dict__.pop('hours_worked', None)
+        self.__dict__.pop('is_full_day', None)
+    
+    def refresh_computed_fields(self, settings, holiday_dates=None):
+        """
+        Recompute employeeDayStatus in memory (no query for the row itself), unless HR
+        has overridden it; the calendar flags are always refreshed.
+        Bulk callers fetch settings once and pass it in, then persist with bulk_update();
+        load records with select_related('employee') so no per-row user query is issued.
+        """
+        work_start = _work_start(settings)
+        self.date = _as_date(self.date)
+        self.is_weekend = self.date.weekday() >= 5
+        self.is_holiday = self.date in holiday_dates if holiday_dates is not None else Holiday.is_holiday(self.date)
+        if self.status_overridden:
+            return
+        self.employeeDayStatus = _STATUS_TABLE[(
+            self._get_employee_status(),
+            self.is_weekend,
+            self.is_holiday,
+            bool(self.clock_in_time) and self.clock_in_time <= work_start,
+        )]
+    
+    def _get_employee_status(self):
+        # Use the preloaded employee when there is one; otherwise fetch the single
+        # column rather than materialising the whole (wide) CustomUser row
+        if Attendance.employee.is_cached(self):
+            return self.employee.employee_status
+        return CustomUser.objects.filter(pk=self.employee_id).values_list('employee_status', flat=True).first()
+    
+    @classmethod
+    def validate_many(cls, instances, settings=None):
+        """
+        Check clock order and compute status for a batch of unsaved or loaded records.
+        Holidays for the batch's dates come from one query; persist afterwards with
+        bulk_create()/bulk_update().
+        """
+        holiday_dates = frozenset(
+            Holiday.objects.filter(date__in={_as_date(instance.date) for instance in instances}, is_active=True)
+            .values_list('date', flat=True)
+        )
+        if settings is None:
+            settings = AttendanceSettings.get_active_settings()
+        for instance in instances:
+            # The clock_out_after_in rule, checked in memory so the batch issues no per-row query
+            if instance.clock_in_time and instance.clock_out_time and instance.clock_out_time <= instance.clock_in_time:
+                raise ValidationError(_CLOCK_ORDER_ERROR)
+            instance.refresh_computed_fields(settings, holiday_dates)
+    
+    @classmethod
+    def bulk_mark_absent(cls, date):
+        """
+        End-of-day job: create the record for every active employee who has none for `date`.
+        Status is computed exactly as save() would (ABSENT unless weekend, holiday, leave or
+        suspension) from one employee query plus the cached settings/holidays, then written
+        with a single bulk_create. Employees who already have a record are left out up front.
+        Returns the number of records built; ignore_conflicts only guards against a clock-in
+        racing the job, and such a row is skipped by the database but still counted.
+        """
+        settings = AttendanceSettings.get_active_settings()
+        if settings and not settings.auto_mark_absent_after_deadline:
+            return 0
+        date = _as_date(date)
+        is_weekend = date.weekday() >= 5
+        is_holiday = Holiday.is_holiday(date)
+        classify = _make_day_classifier(_work_start(settings), is_weekend, is_holiday)
+        employees = (
+            CustomUser.objects.filter(is_active=True)
+            .exclude(Exists(cls.objects.filter(employee=OuterRef('pk'), date=date)))
+            .only('id', 'employee_status')
+        )
+        records = [
+            cls(
+                employee=employee,
+                date=date,
+                employeeDayStatus=classify(employee.employee_status, None),
+                is_weekend=is_weekend,
+                is_holiday=is_holiday,
+            )
+            for employee in employees
+        ]
+        cls.objects.bulk_create(records, batch_size=500, ignore_conflicts=True)
+        return len(records)
     
+    @cached_property
     def is_full_day(self):
         return self.hours_worked and self.hours_worked >= 8
     
     def can_request_approval(self):
-        return self.employeeDayStatus == 'ABSENT' and not self.has_pending_approval_request
+        return self.employeeDayStatus == 'ABSENT' and not self.has_pending_request()
+    
+    def has_pending_request(self):
+        # Uses the with_pending_flag() annotation when the queryset provided it
+        if 'has_pending_approval_request' in self.__dict__:
+            return self.has_pending_approval_request
+        return self.approval_requests.filter(status__in=LIVE_REQUEST_STATUSES).exists()
     
     @staticmethod
     def is_employee_suspended(employee, date):
         return employee.employee_status == 'SUSPENDED'
 
 
+class AttendanceApprovalRequestQuerySet(models.QuerySet):
+    def queue(self):
+        """Everything an approval queue touches (__str__, get_supervisor, reviewer names) in one query"""
+        return self.select_related('attendance', 'employee', 'assigned_supervisor', 'supervisor_reviewed_by', 'hr_reviewed_by')
+    
+    def for_dashboard(self):
+        """Table listings: skips the free-text and file columns (reading one later costs a query per row)"""
+        return self.defer('reason', 'supporting_documents', 'supervisor_review_notes', 'hr_review_notes')
+
+
 class AttendanceApprovalRequest(models.Model):
+    # Stored by position (see SmallIntChoiceField): append new statuses, never reorder
     STATUS_CHOICES = [
         ('PENDING', 'Pending Supervisor Review'),
         ('SUPERVISOR_APPROVED', 'Supervisor Approved - Awaiting HR'),
@@ -140,10 +349,13 @@ class AttendanceApprovalRequest(models.Model):
     ]
     
     attendance = models.ForeignKey(Attendance, on_delete=models.CASCADE, related_name='approval_requests', verbose_name='Attendance Record')
+    attendance_date = models.DateField(db_index=True, verbose_name='Attendance Date')
     employee = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='attendance_requests', verbose_name='Employee')
+    unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='attendance_requests', verbose_name='Unit (at time of request)')
+    assigned_supervisor = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+', verbose_name='Assigned Supervisor')
     reason = models.TextField(verbose_name='Reason for Absence')
     supporting_documents = models.FileField(upload_to='attendance_approvals/', null=True, blank=True, verbose_name='Supporting Documents (Optional)')
-    status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='PENDING', verbose_name='Request Status')
+    status = SmallIntChoiceField(choices=STATUS_CHOICES, default='PENDING', verbose_name='Request Status')
     
     supervisor_reviewed_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='supervisor_reviewed_requests', verbose_name='Supervisor Reviewed By')
     supervisor_review_notes = models.TextField(null=True, blank=True, verbose_name='Supervisor Notes')
@@ -156,72 +368,193 @@ class AttendanceApprovalRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Requested At')
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AttendanceApprovalRequestQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Attendance Approval Request'
         verbose_name_plural = 'Attendance Approval Requests'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['status']),
+            # Dashboards only query the live workflow states; terminal rows stay out of this index
+            models.Index(
+                fields=['status'],
+                include=['employee', 'attendance', 'created_at'],
+                condition=Q(status__in=LIVE_REQUEST_STATUSES),
+                name='aar_live_status_idx',
+            ),
             models.Index(fields=['employee', 'status']),
+            # Ordered pages over any status; no INCLUDE, aar_live_status_idx covers the live states
+            models.Index(fields=['status', '-created_at'], name='aar_status_created_idx'),
+            # Supervisor queues; also serves the FK, so assigned_supervisor has db_index=False
+            models.Index(fields=['assigned_supervisor', 'status']),
         ]
     
     def __str__(self):
         return f"{self.employee.get_full_name()} - {self.attendance.date} - {self.status}"
     
+    def save(self, *args, **kwargs):
+        # Snapshot the employee's unit, its supervisor and the attendance date so
+        # supervisor queues and the admin date filter work on this table alone
+        if self._state.adding:
+            if self.unit_id is None:
+                self.unit_id = self.employee.unit_id
+            if self.assigned_supervisor_id is None and self.unit_id is not None:
+                self.assigned_supervisor_id = Unit.objects.filter(pk=self.unit_id).values_list('supervisor_id', flat=True).first()
+            self.attendance_date = self.attendance.date
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def pending_for_supervisor(cls, supervisor):
+        """
+        The supervisor's pending queue, cached briefly. Invalidated by the post_save/post_delete
+        handlers in signals.py, by bulk_supervisor_approve() and by reroute_pending().
+        """
+        return cache.get_or_set(
+            pending_queue_cache_key(supervisor.pk),
+            lambda: list(cls.objects.queue().filter(status='PENDING', assigned_supervisor=supervisor)),
+            timeout=60,
+        )
+    
+    @classmethod
+    def reroute_pending(cls, queryset, unit_id, supervisor_id):
+        """
+        Point the pending requests in `queryset` at a new unit/supervisor snapshot, for when a
+        unit changes supervisor or an employee moves unit. Clears the cached queues of the old
+        and new supervisors. Returns the number of requests moved.
+        """
+        pending = queryset.filter(status='PENDING')
+        with transaction.atomic():
+            supervisor_ids = set(pending.order_by().values_list('assigned_supervisor_id', flat=True).distinct())
+            if not supervisor_ids:
+                return 0
+            updated = pending.update(unit_id=unit_id, assigned_supervisor_id=supervisor_id, updated_at=Now())
+        supervisor_ids.add(supervisor_id)
+        supervisor_ids.discard(None)
+        cache.delete_many([pending_queue_cache_key(pk) for pk in supervisor_ids])
+        return updated
+    
+    @classmethod
+    def bulk_supervisor_approve(cls, queryset, supervisor, notes=None):
+        """
+        Supervisor-approve every pending request in `queryset` with one UPDATE.
+        Timestamps come from the database clock. Returns the number approved.
+        """
+        pending = queryset.filter(status='PENDING')
+        # The approver may be a superuser: clear the queues of the supervisors the requests were assigned to
+        supervisor_ids = set(
+            pending.exclude(assigned_supervisor=None).order_by()
+            .values_list('assigned_supervisor_id', flat=True).distinct()
+        )
+        updated = pending.update(
+            status='SUPERVISOR_APPROVED',
+            supervisor_reviewed_by=supervisor,
+            supervisor_review_notes=notes,
+            supervisor_reviewed_at=Now(),
+            updated_at=Now(),
+        )
+        cache.delete_many([pending_queue_cache_key(supervisor_id) for supervisor_id in supervisor_ids])
+        return updated
+    
+    @classmethod
+    def bulk_hr_approve(cls, queryset, hr_user, notes=None):
+        """
+        HR-approve every supervisor-approved request in `queryset` and mark the matching
+        attendance records PRESENT: one locking SELECT and two UPDATEs regardless of size.
+        Returns the number approved.
+        """
+        with transaction.atomic():
+            # Callers may pass a joined queryset (the admin changelist does), and FOR UPDATE
+            # can't lock the nullable side of an outer join
+            rows = list(
+                queryset.select_related(None).select_for_update()
+                .filter(status='SUPERVISOR_APPROVED').values_list('pk', 'attendance_id')
+            )
+            if not rows:
+                return 0
+            request_ids, attendance_ids = zip(*rows)
+            now = timezone.now()
+            cls.objects.filter(pk__in=request_ids).update(
+                status='HR_APPROVED',
+                hr_reviewed_by=hr_user,
+                hr_review_notes=notes,
+                hr_reviewed_at=now,
+                updated_at=now,
+            )
+            Attendance.objects.filter(pk__in=attendance_ids).update(
+                employeeDayStatus='PRESENT', status_overridden=True, updated_at=now
+            )
+        return len(request_ids)
+    
+    def _transition(self, expected_status, error_message, **changes):
+        """
+        Compare-and-set: apply `changes` only while the row still has `expected_status`.
+        Zero rows updated means another reviewer got there first (or the in-memory
+        status was stale), so the decision is refused.
+        """
+        changes['updated_at'] = timezone.now()
+        updated = AttendanceApprovalRequest.objects.filter(pk=self.pk, status=expected_status).update(**changes)
+        if not updated:
+            raise ValidationError(error_message)
+        for name, value in changes.items():
+            setattr(self, name, value)
+        # update() sends no post_save, so drop the cached queue a PENDING request left
+        if expected_status == 'PENDING' and self.assigned_supervisor_id is not None:
+            cache.delete(pending_queue_cache_key(self.assigned_supervisor_id))
+    
     def supervisor_approve(self, supervisor, notes=None):
-        if self.status != 'PENDING':
-            raise ValidationError("Can only approve pending requests")
-        self.status = 'SUPERVISOR_APPROVED'
-        self.supervisor_reviewed_by = supervisor
-        self.supervisor_review_notes = notes
-        self.supervisor_reviewed_at = timezone.now()
-        self.save()
+        self._transition(
+            'PENDING', "Can only approve pending requests",
+            status='SUPERVISOR_APPROVED',
+            supervisor_reviewed_by=supervisor,
+            supervisor_review_notes=notes,
+            supervisor_reviewed_at=timezone.now(),
+        )
     
     def supervisor_reject(self, supervisor, notes):
-        if self.status != 'PENDING':
-            raise ValidationError("Can only reject pending requests")
-        self.status = 'REJECTED'
-        self.supervisor_reviewed_by = supervisor
-        self.supervisor_review_notes = notes
-        self.supervisor_reviewed_at = timezone.now()
-        self.save()
-        self.attendance.has_pending_approval_request = False
-        self.attendance.save()
+        self._transition(
+            'PENDING', "Can only reject pending requests",
+            status='REJECTED',
+            supervisor_reviewed_by=supervisor,
+            supervisor_review_notes=notes,
+            supervisor_reviewed_at=timezone.now(),
+        )
     
     def hr_approve(self, hr_user, notes=None):
-        if self.status != 'SUPERVISOR_APPROVED':
-            raise ValidationError("Can only approve supervisor-approved requests")
-        self.status = 'HR_APPROVED'
-        self.hr_reviewed_by = hr_user
-        self.hr_review_notes = notes
-        self.hr_reviewed_at = timezone.now()
-        self.save()
-        self.attendance.employeeDayStatus = 'PRESENT'
-        self.attendance.has_pending_approval_request = False
-        self.attendance.save()
+        with transaction.atomic():
+            self._transition(
+                'SUPERVISOR_APPROVED', "Can only approve supervisor-approved requests",
+                status='HR_APPROVED',
+                hr_reviewed_by=hr_user,
+                hr_review_notes=notes,
+                hr_reviewed_at=timezone.now(),
+            )
+            # status_overridden stops later saves recomputing this back to ABSENT
+            Attendance.objects.filter(pk=self.attendance_id).update(
+                employeeDayStatus='PRESENT', status_overridden=True, updated_at=timezone.now()
+            )
     
     def hr_reject(self, hr_user, notes):
-        if self.status != 'SUPERVISOR_APPROVED':
-            raise ValidationError("Can only reject supervisor-approved requests")
-        self.status = 'REJECTED'
-        self.hr_reviewed_by = hr_user
-        self.hr_review_notes = notes
-        self.hr_reviewed_at = timezone.now()
-        self.save()
-        self.attendance.has_pending_approval_request = False
-        self.attendance.save()
+        self._transition(
+            'SUPERVISOR_APPROVED', "Can only reject supervisor-approved requests",
+            status='REJECTED',
+            hr_reviewed_by=hr_user,
+            hr_review_notes=notes,
+            hr_reviewed_at=timezone.now(),
+        )
+    
+    @cached_property
+    def supervisor(self):
+        return self.assigned_supervisor
     
     def get_supervisor(self):
-        if self.employee.unit and self.employee.unit.supervisor:
-            return self.employee.unit.supervisor
-        return None
+        return self.supervisor
     
     def can_user_review_as_supervisor(self, user):
-        supervisor = self.get_supervisor()
+        supervisor = self.supervisor
         return supervisor and supervisor == user
     
     def can_user_review_as_hr(self, user):
-        return user.approval_level == 'HR_ADMIN'
+        return user.is_hr_admin
     
     def can_supervisor_review(self):
         return self.status == 'PENDING'
@@ -0,0 +1,20 @@
+from django.db.models import Count, Q
+from .models import Attendance
+
+
+def status_counts(start_date, end_date):
+    """
+    Per-employee day counts for each status over a date range, in one grouped query.
+    Statuses are resolved when records are written, so reports never recompute them per day.
+    """
+    counts = {
+        status.lower(): Count('pk', filter=Q(employeeDayStatus=status))
+        for status, _ in Attendance.STATUS_CHOICES
+    }
+    counts['working_days'] = Count('pk', filter=Q(is_weekend=False, is_holiday=False))
+    return (
+        Attendance.objects.filter(date__range=(start_date, end_date))
+        .values('employee')
+        .annotate(**counts)
+        .order_by('employee')
+    )
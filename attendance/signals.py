@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from accounts.models import CustomUser, Unit
+from .models import Holiday, AttendanceSettings, AttendanceApprovalRequest, ACTIVE_HOLIDAYS_CACHE_KEY, ACTIVE_SETTINGS_CACHE_KEY, pending_queue_cache_key
+
+
+@receiver([post_save, post_delete], sender=Holiday)
+def invalidate_active_holidays(sender, **kwargs):
+    cache.delete(ACTIVE_HOLIDAYS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=AttendanceSettings)
+def invalidate_active_settings(sender, **kwargs):
+    cache.delete(ACTIVE_SETTINGS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=AttendanceApprovalRequest)
+def invalidate_pending_queue(sender, instance, **kwargs):
+    if instance.assigned_supervisor_id is not None:
+        cache.delete(pending_queue_cache_key(instance.assigned_supervisor_id))
+
+
+@receiver(post_save, sender=Unit)
+def reroute_unit_requests(sender, instance, created, **kwargs):
+    # Requests snapshot the unit's supervisor when created; keep pending ones with the current one
+    if created:
+        return
+    AttendanceApprovalRequest.reroute_pending(
+        AttendanceApprovalRequest.objects.filter(unit=instance).exclude(assigned_supervisor_id=instance.supervisor_id),
+        instance.pk,
+        instance.supervisor_id,
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def reroute_moved_employee_requests(sender, instance, created, update_fields=None, **kwargs):
+    # Skip new users and partial saves that can't change the unit (e.g. last_login on every sign-in)
+    if created or (update_fields is not None and 'unit' not in update_fields):
+        return
+    moved = AttendanceApprovalRequest.objects.filter(employee=instance, status='PENDING').exclude(unit_id=instance.unit_id)
+    if not moved.exists():
+        return
+    supervisor_id = Unit.objects.filter(pk=instance.unit_id).values_list('supervisor_id', flat=True).first()
+    AttendanceApprovalRequest.reroute_pending(moved, instance.unit_id, supervisor_id)
@@ -1,3 +1,361 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import IntegerField
+from django.db.models.functions import Cast
+from django.forms import modelform_factory
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser, Department, Unit
+from .models import Attendance, AttendanceApprovalRequest, AttendanceSettings, Holiday, pending_queue_cache_key
+
+
+class SmallIntChoiceFieldTests(SimpleTestCase):
+    """Conversions between the string codes used in Python and the stored integers"""
+    
+    field = Attendance._meta.get_field('employeeDayStatus')
+    
+    def test_codes_are_stored_by_position(self):
+        self.assertEqual(self.field.get_prep_value('PRESENT'), 1)
+        self.assertEqual(self.field.get_prep_value('SUSPENDED'), 6)
+    
+    def test_integers_and_none_pass_through_get_prep_value(self):
+        self.assertEqual(self.field.get_prep_value(2), 2)
+        self.assertIsNone(self.field.get_prep_value(None))
+    
+    def test_from_db_value_returns_code(self):
+        self.assertEqual(self.field.from_db_value(2, None, None), 'ABSENT')
+        self.assertIsNone(self.field.from_db_value(None, None, None))
+    
+    def test_to_python_accepts_codes_and_integers(self):
+        self.assertEqual(self.field.to_python('HOLIDAY'), 'HOLIDAY')
+        self.assertEqual(self.field.to_python(3), 'ON_LEAVE')
+    
+    def test_unknown_code_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.field.get_prep_value('LATE')
+    
+    def test_form_full_clean_keeps_code(self):
+        AttendanceForm = modelform_factory(Attendance, fields=['employeeDayStatus'])
+        form = AttendanceForm(data={'employeeDayStatus': 'ABSENT'}, instance=Attendance())
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['employeeDayStatus'], 'ABSENT')
+        self.assertEqual(form.instance.employeeDayStatus, 'ABSENT')
+    
+    def test_form_full_clean_rejects_unknown_code(self):
+        AttendanceForm = modelform_factory(Attendance, fields=['employeeDayStatus'])
+        form = AttendanceForm(data={'employeeDayStatus': 'LATE'}, instance=Attendance())
+        self.assertFalse(form.is_valid())
+        self.assertIn('employeeDayStatus', form.errors)
+
+
+class SmallIntChoiceFieldQueryTests(TestCase):
+    """The same conversions through the ORM; rows are bulk-created so save() doesn't recompute status"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(email='staff@example.com', first_name='Ada', last_name='Obi')
+        cls.present, cls.absent = Attendance.objects.bulk_create([
+            Attendance(employee=cls.employee, date=datetime.date(2026, 3, 2), employeeDayStatus='PRESENT'),
+            Attendance(employee=cls.employee, date=datetime.date(2026, 3, 3), employeeDayStatus='ABSENT'),
+        ])
+    
+    def stored_value(self, record):
+        return Attendance.objects.filter(pk=record.pk).values_list(
+            Cast('employeeDayStatus', IntegerField()), flat=True
+        ).get()
+    
+    def test_round_trip(self):
+        self.assertEqual(Attendance.objects.get(pk=self.present.pk).employeeDayStatus, 'PRESENT')
+        self.assertEqual(self.stored_value(self.present), 1)
+        self.assertEqual(
+            Attendance.objects.filter(pk=self.absent.pk).values_list('employeeDayStatus', flat=True).get(),
+            'ABSENT',
+        )
+    
+    def test_filter_and_in(self):
+        self.assertQuerySetEqual(Attendance.objects.filter(employeeDayStatus='ABSENT'), [self.absent])
+        self.assertEqual(Attendance.objects.filter(employeeDayStatus__in=['PRESENT', 'ABSENT']).count(), 2)
+        self.assertFalse(Attendance.objects.filter(employeeDayStatus__in=['HOLIDAY', 'WEEKEND']).exists())
+    
+    def test_update(self):
+        Attendance.objects.filter(pk=self.absent.pk).update(employeeDayStatus='HOLIDAY')
+        self.assertEqual(self.stored_value(self.absent), 5)
+        self.absent.refresh_from_db()
+        self.assertEqual(self.absent.employeeDayStatus, 'HOLIDAY')
+    
+    def test_bulk_update(self):
+        self.present.employeeDayStatus = 'ON_LEAVE'
+        self.absent.employeeDayStatus = 'SUSPENDED'
+        Attendance.objects.bulk_update([self.present, self.absent], ['employeeDayStatus'])
+        self.assertEqual(self.stored_value(self.present), 3)
+        self.assertEqual(self.stored_value(self.absent), 6)
+    
+    def test_unknown_code_in_filter_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            list(Attendance.objects.filter(employeeDayStatus='LATE'))
+
+
+class ApprovalTransitionTests(TestCase):
+    """Review decisions are compare-and-set UPDATEs on the expected status"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(email='staff@example.com', first_name='Ada', last_name='Obi')
+        cls.supervisor = CustomUser.objects.create_user(
+            email='lead@example.com', first_name='Uche', last_name='Eze', approval_level='SUPERVISOR'
+        )
+        cls.hr = CustomUser.objects.create_user(
+            email='hr@example.com', first_name='Ngozi', last_name='Okafor', approval_level='HR_ADMIN'
+        )
+        [cls.attendance] = Attendance.objects.bulk_create([
+            Attendance(employee=cls.employee, date=datetime.date(2026, 3, 3), employeeDayStatus='ABSENT'),
+        ])
+        cls.approval = AttendanceApprovalRequest.objects.create(
+            attendance=cls.attendance, employee=cls.employee, assigned_supervisor=cls.supervisor, reason='Clinic visit'
+        )
+    
+    def test_supervisor_approve(self):
+        self.approval.supervisor_approve(self.supervisor, 'Confirmed')
+        self.assertEqual(self.approval.status, 'SUPERVISOR_APPROVED')
+        self.approval.refresh_from_db()
+        self.assertEqual(self.approval.status, 'SUPERVISOR_APPROVED')
+        self.assertEqual(self.approval.supervisor_reviewed_by, self.supervisor)
+        self.assertEqual(self.approval.supervisor_review_notes, 'Confirmed')
+    
+    def test_stale_instance_is_refused(self):
+        first = AttendanceApprovalRequest.objects.get(pk=self.approval.pk)
+        stale = AttendanceApprovalRequest.objects.get(pk=self.approval.pk)
+        first.supervisor_approve(self.supervisor)
+        # stale still reads PENDING in memory, but the row no longer matches
+        with self.assertRaisesMessage(ValidationError, 'Can only reject pending requests'):
+            stale.supervisor_reject(self.supervisor, 'Too late')
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'SUPERVISOR_APPROVED')
+        self.assertIsNone(stale.supervisor_review_notes)
+    
+    def test_hr_approve_requires_supervisor_approval(self):
+        with self.assertRaisesMessage(ValidationError, 'Can only approve supervisor-approved requests'):
+            self.approval.hr_approve(self.hr)
+        self.approval.refresh_from_db()
+        self.attendance.refresh_from_db()
+        self.assertEqual(self.approval.status, 'PENDING')
+        self.assertIsNone(self.approval.hr_reviewed_by)
+        self.assertEqual(self.attendance.employeeDayStatus, 'ABSENT')
+    
+    def test_hr_approve_marks_attendance_present(self):
+        self.approval.supervisor_approve(self.supervisor)
+        self.approval.hr_approve(self.hr)
+        self.approval.refresh_from_db()
+        self.attendance.refresh_from_db()
+        self.assertEqual(self.approval.status, 'HR_APPROVED')
+        self.assertEqual(self.attendance.employeeDayStatus, 'PRESENT')
+        self.assertTrue(self.attendance.status_overridden)
+    
+    def test_save_keeps_hr_override(self):
+        self.approval.supervisor_approve(self.supervisor)
+        self.approval.hr_approve(self.hr)
+        self.attendance.refresh_from_db()
+        # No clock-in, so the computed status would be ABSENT
+        self.attendance.save()
+        self.attendance.refresh_from_db()
+        self.assertEqual(self.attendance.employeeDayStatus, 'PRESENT')
+
+
+class HoursWorkedTests(TestCase):
+    """hours_worked is a GeneratedField computed by the database"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(email='staff@example.com', first_name='Ada', last_name='Obi')
+    
+    def test_value_reloads_after_update(self):
+        record = Attendance.objects.create(
+            employee=self.employee, date=datetime.date(2026, 3, 2), clock_in_time=datetime.time(8, 30)
+        )
+        self.assertIsNone(record.hours_worked)
+        record.clock_out_time = datetime.time(17, 0)
+        record.save()
+        self.assertEqual(record.hours_worked, Decimal('8.50'))
+        self.assertTrue(record.is_full_day)
+    
+    def test_expression_value(self):
+        [record] = Attendance.objects.bulk_create([
+            Attendance(
+                employee=self.employee, date=datetime.date(2026, 3, 3), employeeDayStatus='PRESENT',
+                clock_in_time=datetime.time(9, 0), clock_out_time=datetime.time(15, 45),
+            ),
+        ])
+        Attendance.objects.filter(pk=record.pk).update(clock_out_time=datetime.time(16, 15))
+        self.assertEqual(Attendance.objects.values_list('hours_worked', flat=True).get(pk=record.pk), Decimal('7.25'))
+
+
+class RequestRoutingTests(TestCase):
+    """Pending requests follow the employee's current unit supervisor (signals.py)"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Information Technology', code='IT')
+        cls.lead_a = CustomUser.objects.create_user(email='lead.a@example.com', first_name='Uche', last_name='Eze', approval_level='SUPERVISOR')
+        cls.lead_b = CustomUser.objects.create_user(email='lead.b@example.com', first_name='Tunde', last_name='Bello', approval_level='SUPERVISOR')
+        cls.unit_a = Unit.objects.create(name='Network Team', code='NET', department=department, supervisor=cls.lead_a)
+        cls.unit_b = Unit.objects.create(name='Backend Development', code='DEV', department=department, supervisor=cls.lead_b)
+        cls.employee = CustomUser.objects.create_user(email='staff@example.com', first_name='Ada', last_name='Obi', unit=cls.unit_a)
+        [attendance] = Attendance.objects.bulk_create([
+            Attendance(employee=cls.employee, date=datetime.date(2026, 3, 3), employeeDayStatus='ABSENT'),
+        ])
+        cls.approval = AttendanceApprovalRequest.objects.create(attendance=attendance, employee=cls.employee, reason='Clinic visit')
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_snapshot_on_create(self):
+        self.assertEqual(self.approval.unit, self.unit_a)
+        self.assertEqual(self.approval.assigned_supervisor, self.lead_a)
+        self.assertEqual(self.approval.attendance_date, datetime.date(2026, 3, 3))
+    
+    def test_supervisor_change_reroutes_pending(self):
+        new_lead = CustomUser.objects.create_user(email='lead.c@example.com', first_name='Kemi', last_name='Ade', approval_level='SUPERVISOR')
+        cache.set(pending_queue_cache_key(self.lead_a.pk), ['stale'])
+        self.unit_a.supervisor = new_lead
+        self.unit_a.save()
+        self.approval.refresh_from_db()
+        self.assertEqual(self.approval.assigned_supervisor, new_lead)
+        self.assertIsNone(cache.get(pending_queue_cache_key(self.lead_a.pk)))
+    
+    def test_supervisor_change_leaves_decided_requests(self):
+        self.approval.supervisor_approve(self.lead_a)
+        self.unit_a.supervisor = None
+        self.unit_a.save()
+        self.approval.refresh_from_db()
+        self.assertEqual(self.approval.assigned_supervisor, self.lead_a)
+    
+    def test_employee_unit_move_reroutes_pending(self):
+        cache.set(pending_queue_cache_key(self.lead_a.pk), ['stale'])
+        self.employee.unit = self.unit_b
+        self.employee.save()
+        self.approval.refresh_from_db()
+        self.assertEqual(self.approval.unit, self.unit_b)
+        self.assertEqual(self.approval.assigned_supervisor, self.lead_b)
+        self.assertIsNone(cache.get(pending_queue_cache_key(self.lead_a.pk)))
+    
+    def test_last_login_save_is_skipped(self):
+        self.employee.unit = self.unit_b
+        self.employee.last_login = timezone.now()
+        # Only the UPDATE itself: the handler issues no query for a last_login save
+        with self.assertNumQueries(1):
+            self.employee.save(update_fields=['last_login'])
+        self.approval.refresh_from_db()
+        self.assertEqual(self.approval.assigned_supervisor, self.lead_a)
+
+
+class BulkApprovalTests(TestCase):
+    """Bulk review actions update every selected request and clear the cached queues"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.supervisor = CustomUser.objects.create_user(email='lead@example.com', first_name='Uche', last_name='Eze', approval_level='SUPERVISOR')
+        cls.hr = CustomUser.objects.create_user(email='hr@example.com', first_name='Ngozi', last_name='Okafor', approval_level='HR_ADMIN')
+        cls.admin = CustomUser.objects.create_superuser(email='admin@example.com', first_name='Root', last_name='Admin')
+        employees = [
+            CustomUser.objects.create_user(email=f'staff{n}@example.com', first_name='Staff', last_name=str(n))
+            for n in range(2)
+        ]
+        cls.attendances = Attendance.objects.bulk_create([
+            Attendance(employee=employee, date=datetime.date(2026, 3, 3), employeeDayStatus='ABSENT')
+            for employee in employees
+        ])
+        for attendance in cls.attendances:
+            AttendanceApprovalRequest.objects.create(
+                attendance=attendance, employee=attendance.employee, assigned_supervisor=cls.supervisor, reason='Site visit'
+            )
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_bulk_supervisor_approve_clears_assigned_queue(self):
+        cache.set(pending_queue_cache_key(self.supervisor.pk), ['stale'])
+        # A superuser approving must still clear the assigned supervisor's queue
+        approved = AttendanceApprovalRequest.bulk_supervisor_approve(AttendanceApprovalRequest.objects.all(), self.admin)
+        self.assertEqual(approved, 2)
+        self.assertIsNone(cache.get(pending_queue_cache_key(self.supervisor.pk)))
+        self.assertFalse(AttendanceApprovalRequest.objects.exclude(status='SUPERVISOR_APPROVED').exists())
+    
+    def test_bulk_hr_approve_marks_attendance_present(self):
+        AttendanceApprovalRequest.bulk_supervisor_approve(AttendanceApprovalRequest.objects.all(), self.supervisor)
+        approved = AttendanceApprovalRequest.bulk_hr_approve(AttendanceApprovalRequest.objects.queue(), self.hr)
+        self.assertEqual(approved, 2)
+        self.assertFalse(AttendanceApprovalRequest.objects.exclude(status='HR_APPROVED').exists())
+        self.assertEqual(
+            set(Attendance.objects.values_list('employeeDayStatus', 'status_overridden')),
+            {('PRESENT', True)},
+        )
+    
+    def test_bulk_hr_approve_skips_pending(self):
+        self.assertEqual(AttendanceApprovalRequest.bulk_hr_approve(AttendanceApprovalRequest.objects.all(), self.hr), 0)
+        self.assertFalse(Attendance.objects.filter(employeeDayStatus='PRESENT').exists())
+
+
+class BulkMarkAbsentTests(TestCase):
+    """End-of-day job creating the records of employees who never clocked in"""
+    
+    monday = datetime.date(2026, 3, 2)
+    saturday = datetime.date(2026, 3, 7)
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.clocked_in = CustomUser.objects.create_user(email='early@example.com', first_name='Ada', last_name='Obi')
+        cls.missing = CustomUser.objects.create_user(email='missing@example.com', first_name='Bayo', last_name='Ola')
+        CustomUser.objects.create_user(email='former@example.com', first_name='Chidi', last_name='Nwosu', is_active=False)
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.clocked_in, date=cls.monday, clock_in_time=datetime.time(8, 45), employeeDayStatus='PRESENT'),
+        ])
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_creates_only_missing_records(self):
+        self.assertEqual(Attendance.bulk_mark_absent(self.monday), 1)
+        self.assertEqual(Attendance.objects.get(employee=self.missing, date=self.monday).employeeDayStatus, 'ABSENT')
+        self.assertEqual(Attendance.objects.get(employee=self.clocked_in, date=self.monday).employeeDayStatus, 'PRESENT')
+        self.assertEqual(Attendance.objects.filter(date=self.monday).count(), 2)
+    
+    def test_weekend(self):
+        self.assertEqual(Attendance.bulk_mark_absent(self.saturday), 2)
+        self.assertEqual(set(Attendance.objects.filter(date=self.saturday).values_list('employeeDayStatus', flat=True)), {'WEEKEND'})
+    
+    def test_disabled_by_settings(self):
+        AttendanceSettings.objects.create(auto_mark_absent_after_deadline=False)
+        self.assertEqual(Attendance.bulk_mark_absent(self.monday), 0)
+        self.assertFalse(Attendance.objects.filter(employee=self.missing).exists())
+
+
+@override_settings(HOLIDAY_CACHE_ENABLED=True)
+class CacheInvalidationTests(TestCase):
+    """The post_save/post_delete handlers in signals.py drop the cached lookups"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_holiday_save_and_delete(self):
+        date = datetime.date(2026, 10, 1)
+        self.assertFalse(Holiday.is_holiday(date))
+        holiday = Holiday.objects.create(name='Independence Day', date=date)
+        self.assertTrue(Holiday.is_holiday(date))
+        holiday.delete()
+        self.assertFalse(Holiday.is_holiday(date))
+    
+    def test_holiday_accepts_datetime(self):
+        Holiday.objects.create(name='Independence Day', date=datetime.date(2026, 10, 1))
+        moment = timezone.make_aware(datetime.datetime(2026, 10, 1, 10, 0))
+        self.assertTrue(Holiday.is_holiday(moment))
+    
+    def test_settings_save(self):
+        settings = AttendanceSettings.objects.create()
+        self.assertEqual(AttendanceSettings.get_active_settings().work_start_time, datetime.time(9, 0))
+        settings.work_start_time = datetime.time(8, 0)
+        settings.save()
+        self.assertEqual(AttendanceSettings.get_active_settings().work_start_time, datetime.time(8, 0))
@@ -1,5 +1,6 @@
 from pathlib import Path
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -78,6 +79,41 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
+        # Reuse connections across requests; clock-in is a burst of short transactions
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Attendance settings, holidays and supervisor queues are cached and invalidated by the
+# signal handlers in attendance/signals.py. In production the backend must be shared by
+# every worker process, otherwise only the worker that handled a save sees the change:
+# set CACHE_BACKEND to Redis (django.core.cache.backends.redis.RedisCache, needs `redis`)
+# or Memcached (django.core.cache.backends.memcached.PyMemcacheCache, needs `pymemcache`)
+# and CACHE_LOCATION to its URL. Development (DEBUG=True) defaults to the per-process
+# LocMemCache.
+SHARED_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+CACHE_BACKEND = config(
+    'CACHE_BACKEND',
+    default='django.core.cache.backends.locmem.LocMemCache' if DEBUG else '',
+)
+if not DEBUG and CACHE_BACKEND not in SHARED_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND must be a Redis or Memcached backend when DEBUG is off '
+        f'(got {CACHE_BACKEND!r}); see the Cache section of system/settings.py.'
+    )
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default=''),
     }
 }
 
@@ -124,4 +160,8 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Custom User Model
-AUTH_USER_MODEL = 'accounts.CustomUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'accounts.CustomUser'
+
+# Serve Attendance holiday checks from a cached set of active dates
+# (falls back to a per-date EXISTS query when disabled)
+HOLIDAY_CACHE_ENABLED = config('HOLIDAY_CACHE_ENABLED', default=True, cast=bool)
\ No newline at end of file